@@ -0,0 +1,6 @@
+"""
+Benchmark suite for the satellite pipeline. Usage:
+
+    $ python -m benchmarks run --days 1,7 --areas RJ,BRA --adms 1,100,5570
+    $ python -m benchmarks compare benchmarks/results/A.json benchmarks/results/B.json
+"""
@@ -0,0 +1,59 @@
+import argparse
+import json
+
+from benchmarks import suite
+
+
+def _ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def _strs(value: str) -> list[str]:
+    return [v.upper() for v in value.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmark suite")
+    run.add_argument("--days", type=_ints, default=[1, 7])
+    run.add_argument("--areas", type=_strs, default=["RJ", "BRA"])
+    run.add_argument("--adms", type=_ints, default=[1, 100, 5570])
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--sql", choices=["sqlite", "duckdb"], default="sqlite")
+    run.add_argument("--only", help="glob on the case names, e.g. 'cope.*'")
+    run.add_argument("--output", help="results file, default: benchmarks/results/")
+
+    cmp = commands.add_parser("compare", help="compare two results files")
+    cmp.add_argument("base")
+    cmp.add_argument("head")
+    cmp.add_argument("--threshold", type=float, default=0.1)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        unknown = set(args.areas).difference(suite.BBOXES)
+        if unknown:
+            parser.error(f"unknown areas {unknown}, options: {list(suite.BBOXES)}")
+        results = suite.Suite(
+            days=args.days,
+            areas=args.areas,
+            adms=args.adms,
+            repeat=args.repeat,
+            sql=args.sql,
+            only=args.only,
+        ).run()
+        print(suite.save(results, args.output))
+        return
+
+    for row in suite.compare(args.base, args.head, args.threshold):
+        print(
+            f"{row['status']:>6}  {row['ratio']:6.2f}x  "
+            f"{row['base']:9.4f}s -> {row['head']:9.4f}s  "
+            f"{row['name']} {json.dumps(row['params'], sort_keys=True)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Benchmark cases and results (JSON) handling. Every case runs offline: the
+NetCDF inputs are the test file and synthetic ERA5-Land datasets, and the
+SQL target is a local SQLite or DuckDB database in a temporary directory.
+"""
+
+from typing import Callable, Optional
+from importlib import metadata
+from datetime import datetime
+from pathlib import Path
+import statistics
+import subprocess
+import tempfile
+import platform
+import zipfile
+import sqlite3
+import fnmatch
+import json
+import time
+
+from loguru import logger
+
+from satellite import DataSet, ADM2
+from satellite.geo import constants
+from satellite.geo.models import ADMBase
+from satellite.extensions.cope import _convert_units
+from benchmarks.synthetic import BBOXES, era5_land_dataset, synthetic_adms
+
+BASE_DIR = Path(__file__).parent
+RESULTS_DIR = BASE_DIR / "results"
+TEST_FILE = BASE_DIR.parent / "tests" / "data" / "BR_20230101.nc"
+
+PACKAGES = [
+    "satellite-weather-downloader",
+    "xarray",
+    "xagg",
+    "geopandas",
+    "shapely",
+    "pandas",
+    "numpy",
+    "duckdb",
+    "h5netcdf",
+    "netCDF4",
+]
+
+
+def measure(
+    func: Callable,
+    repeat: int = 3,
+    setup: Optional[Callable] = None,
+) -> dict:
+    """
+    Runs `func` `repeat` times, `setup` is called before each run and is
+    not included in the timings (seconds)
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+    }
+
+
+class Suite:
+    def __init__(
+        self,
+        days: list[int],
+        areas: list[str],
+        adms: list[int],
+        repeat: int = 3,
+        sql: str = "sqlite",
+        only: Optional[str] = None,
+    ):
+        self.days = days
+        self.areas = areas
+        self.adms = adms
+        self.repeat = repeat
+        self.sql = sql
+        self.only = only
+        self.results: list[dict] = []
+
+    def run(self) -> dict:
+        with tempfile.TemporaryDirectory() as tmp:
+            self.tmp = Path(tmp)
+            self.bench_from_netcdf()
+            self.bench_convert_units()
+            self.bench_adm_queries()
+            self.bench_read_gpkg()
+            self.bench_cope()
+        return {"meta": metadata_info(), "results": self.results}
+
+    def selected(self, *names: str) -> bool:
+        """Whether any of the case `names` matches `only`"""
+        return not self.only or any(fnmatch.fnmatch(n, self.only) for n in names)
+
+    def add(self, name: str, params: dict, func: Callable, **kwargs) -> None:
+        if not self.selected(name):
+            return
+        logger.info(f"{name} {params}")
+        res = measure(func, **kwargs)
+        self.results.append({"name": name, "params": params, **res})
+
+    def skip(self, name: str, params: dict, reason: str) -> None:
+        if not self.selected(name):
+            return
+        logger.warning(f"{name} {params} skipped: {reason}")
+        self.results.append({"name": name, "params": params, "skipped": reason})
+
+    def bench_from_netcdf(self) -> None:
+        if not self.selected("dataset.from_netcdf"):
+            return
+        self.add(
+            "dataset.from_netcdf",
+            {"input": TEST_FILE.name, "zip": False},
+            lambda: DataSet.from_netcdf(str(TEST_FILE)).load(),
+            repeat=self.repeat,
+        )
+        for area in self.areas:
+            for days in self.days:
+                nc = self.tmp / f"{area}_{days}d.nc"
+                era5_land_dataset(days=days, bbox=BBOXES[area]).to_netcdf(
+                    nc, engine="h5netcdf"
+                )
+                zipped = nc.with_suffix(".zip")
+                with zipfile.ZipFile(zipped, "w") as zfile:
+                    zfile.write(nc, arcname="data_0.nc")
+
+                for fpath, is_zip in ((nc, False), (zipped, True)):
+                    self.add(
+                        "dataset.from_netcdf",
+                        {
+                            "input": "synthetic",
+                            "area": area,
+                            "days": days,
+                            "zip": is_zip,
+                        },
+                        lambda f=fpath: DataSet.from_netcdf(str(f)).load(),
+                        repeat=self.repeat,
+                    )
+
+    def bench_convert_units(self) -> None:
+        if not self.selected("cope._convert_units"):
+            return
+        ds = DataSet.from_netcdf(str(TEST_FILE)).rename(time="valid_time").load()
+        self.add(
+            "cope._convert_units",
+            {"input": TEST_FILE.name},
+            lambda: _convert_units(ds),
+            repeat=self.repeat,
+        )
+        for area in self.areas:
+            for days in self.days:
+                ds = era5_land_dataset(days=days, bbox=BBOXES[area])
+                self.add(
+                    "cope._convert_units",
+                    {"input": "synthetic", "area": area, "days": days},
+                    lambda ds=ds: _convert_units(ds),
+                    repeat=self.repeat,
+                )
+
+    def bench_adm_queries(self) -> None:
+        if not self.selected("geo.ADM2.get", "geo.ADM2.filter"):
+            return
+        self.add(
+            "geo.ADM2.get",
+            {"code": "3304557"},
+            lambda: ADM2.get(code=3304557, adm0="BRA"),
+            repeat=self.repeat,
+        )
+        self.add(
+            "geo.ADM2.filter",
+            {"adm0": "BRA"},
+            lambda: ADM2.filter(adm0="BRA"),
+            repeat=self.repeat,
+        )
+
+    def bench_read_gpkg(self) -> None:
+        if not self.selected("geo._read_gpkg"):
+            return
+        params = {"locale": "BRA"}
+        if not has_gpkgs("BRA"):
+            self.skip("geo._read_gpkg", params, "BRA geometries not found")
+            return
+        self.add(
+            "geo._read_gpkg",
+            params,
+            lambda: ADMBase._read_gpkg("BRA"),
+            setup=ADMBase._read_gpkg.cache_clear,
+            repeat=self.repeat,
+        )
+
+    def bench_cope(self) -> None:
+        if not self.selected("cope.to_dataframe", "cope.to_sql"):
+            return
+        # Real ADM2s if its geometries are available, synthetic otherwise
+        if has_gpkgs("BRA"):
+            source, adms = "gpkg", ADM2.filter(adm0="BRA")
+        else:
+            source, adms = "synthetic", synthetic_adms(max(self.adms))
+
+        ds = era5_land_dataset(days=1, bbox=BBOXES["BRA"])
+        con = self.sql_connection()
+
+        for n in self.adms:
+            params = {"adms": n, "adm_source": source, "days": 1}
+            if n > len(adms):
+                self.skip("cope.to_dataframe", params, f"only {len(adms)} ADMs")
+                continue
+            # Runs once when aggregating more than one ADM
+            repeat = self.repeat if n == 1 else 1
+            self.add(
+                "cope.to_dataframe",
+                params,
+                lambda n=n: ds.cope.to_dataframe(adms[:n]),
+                repeat=repeat,
+            )
+            self.add(
+                "cope.to_sql",
+                {**params, "sql": self.sql},
+                lambda n=n: ds.cope.to_sql(
+                    adms[:n], con=con, tablename="weather", verbose=False
+                ),
+                repeat=repeat,
+            )
+
+    def sql_connection(self):
+        if self.sql == "sqlite":
+            return sqlite3.connect(self.tmp / "bench.sqlite")
+        if self.sql == "duckdb":
+            from sqlalchemy import create_engine
+
+            return create_engine(f"duckdb:///{self.tmp / 'bench.duckdb'}")
+        raise ValueError(f"unknown SQL target {self.sql}")
+
+
+def has_gpkgs(locale: str) -> bool:
+    if locale == "BRA":
+        return any((constants.GPKGS_DIR / "BRA").glob("*.zip"))
+    return (constants.GPKGS_DIR / f"{locale}.zip").exists()
+
+
+def metadata_info() -> dict:
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "versions": versions,
+    }
+
+
+def save(results: dict, output: Optional[str] = None) -> Path:
+    if output:
+        output = Path(output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        output = RESULTS_DIR / f"{stamp}.json"
+    output.write_text(json.dumps(results, indent=2))
+    return output
+
+
+def _key(result: dict) -> tuple[str, str]:
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(base: str, head: str, threshold: float = 0.1) -> list[dict]:
+    """
+    Compares the median timings of two results files. `ratio` is head/base,
+    cases outside `1 ± threshold` are marked as slower or faster
+    """
+    base_res = {_key(r): r for r in json.loads(Path(base).read_text())["results"]}
+    head_res = json.loads(Path(head).read_text())["results"]
+
+    rows = []
+    for result in head_res:
+        before = base_res.get(_key(result))
+        if not before or "skipped" in before or "skipped" in result:
+            continue
+        ratio = result["median"] / before["median"]
+        if ratio > 1 + threshold:
+            status = "slower"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = "="
+        rows.append(
+            {
+                "name": result["name"],
+                "params": result["params"],
+                "base": before["median"],
+                "head": result["median"],
+                "ratio": ratio,
+                "status": status,
+            }
+        )
+    return rows
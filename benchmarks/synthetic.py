@@ -0,0 +1,125 @@
+"""
+Synthetic ERA5-Land like inputs for the benchmark suite. Both the dataset
+and the ADM geometries are generated offline and deterministically (seeded),
+so the runs can be compared between versions & machines.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+import geopandas as gpd
+from shapely.geometry import Polygon
+
+from satellite.geo.models import ADMBase
+
+# N, W, S, E
+BBOXES = {
+    "RJ": (-20.7, -44.9, -23.4, -40.9),
+    "SE": (-14.2, -53.2, -25.4, -39.6),
+    "BRA": (5.5, -74.0, -33.75, -32.25),
+}
+
+
+def era5_land_dataset(
+    days: int = 1,
+    bbox: tuple[float, float, float, float] = BBOXES["BRA"],
+    resolution: float = 0.1,
+    hours: int = 8,
+    start: str = "2023-01-01",
+    seed: int = 0,
+) -> xr.Dataset:
+    """
+    ERA5-Land like dataset (new CDS format) with `hours` steps per day and
+    the variables `t2m`, `tp`, `d2m` and `sp` on a `resolution` grid.
+    """
+    north, west, south, east = bbox
+    latitude = np.round(np.arange(north, south - resolution / 2, -resolution), 4)
+    longitude = np.round(np.arange(west, east + resolution / 2, resolution), 4)
+    valid_time = pd.date_range(start, periods=days * hours, freq=f"{24 // hours}h")
+
+    rng = np.random.default_rng(seed)
+    shape = (len(valid_time), len(latitude), len(longitude))
+
+    t2m = 273.15 + 25 + 5 * rng.standard_normal(shape, dtype=np.float32)
+    d2m = t2m - np.abs(3 * rng.standard_normal(shape, dtype=np.float32))
+    tp = rng.gamma(0.5, 0.002, size=shape).astype(np.float32)
+    sp = 101325 + 500 * rng.standard_normal(shape, dtype=np.float32)
+
+    dims = ("valid_time", "latitude", "longitude")
+    return xr.Dataset(
+        data_vars={
+            "t2m": (dims, t2m, {"units": "K"}),
+            "tp": (dims, tp, {"units": "m"}),
+            "d2m": (dims, d2m, {"units": "K"}),
+            "sp": (dims, sp, {"units": "Pa"}),
+        },
+        coords={
+            "valid_time": valid_time,
+            "latitude": latitude,
+            "longitude": longitude,
+        },
+    )
+
+
+class SyntheticADM(ADMBase):
+    """
+    ADM2 stand-in with a detailed (`vertices` points) jagged geometry, used
+    when the ADM geometries are not available locally.
+    """
+
+    __tablename__ = "synthetic"
+    __fields__ = ["code", "name", "adm0", "adm1"]
+
+    code: str
+    name: str
+    adm0: str
+    adm1: str
+
+    def __init__(self, code: str, geometry: Polygon) -> None:
+        self.code = code
+        self.name = f"Synthetic {code}"
+        self.adm0 = "SYN"
+        self.adm1 = "SYN"
+        self.geometry = geometry
+
+    def to_dataframe(self, tolerance: Optional[float] = None) -> gpd.GeoDataFrame:
+        geometry = self.geometry
+        if tolerance:
+            geometry = geometry.simplify(tolerance, preserve_topology=True)
+        return gpd.GeoDataFrame(
+            {field: [getattr(self, field)] for field in self.__fields__},
+            geometry=[geometry],
+            crs="EPSG:4326",
+        )
+
+
+def synthetic_adms(
+    n: int,
+    bbox: tuple[float, float, float, float] = BBOXES["BRA"],
+    vertices: int = 1000,
+    seed: int = 0,
+) -> list[SyntheticADM]:
+    """
+    `n` non overlapping ADMs tiling the `bbox`. Each geometry is a noisy
+    ellipse inscribed in its tile, emulating detailed municipality borders.
+    """
+    north, west, south, east = bbox
+    cols = int(np.ceil(np.sqrt(n * (east - west) / (north - south))))
+    rows = int(np.ceil(n / cols))
+    width, height = (east - west) / cols, (north - south) / rows
+
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+
+    adms = []
+    for i in range(n):
+        row, col = divmod(i, cols)
+        cx = west + (col + 0.5) * width
+        cy = north - (row + 0.5) * height
+        noise = 1 - 0.1 * rng.random(vertices)
+        xs = cx + 0.45 * width * noise * np.cos(angles)
+        ys = cy + 0.45 * height * noise * np.sin(angles)
+        adms.append(SyntheticADM(code=f"{i:07d}", geometry=Polygon(zip(xs, ys))))
+    return adms
@@ -1,3 +1,27 @@
-from satellite.geo.models import *  # noqa
-from satellite.models import DataSet  # noqa
-from satellite.extensions.cope import CopeExtension  # noqa
+# NOTE: the public objects are loaded lazily (PEP 562), so `import satellite`
+# doesn't pull geopandas, xarray, xagg, cdsapi & co. until they're required.
+# The `ds.cope` accessor is registered when `CopeExtension` is accessed or a
+# dataset is opened via `DataSet`
+import importlib
+
+_lazy_attrs = {
+    "ADM0": "satellite.geo.models",
+    "ADM1": "satellite.geo.models",
+    "ADM2": "satellite.geo.models",
+    "DataSet": "satellite.models",
+    "CopeExtension": "satellite.extensions.cope",
+}
+
+__all__ = list(_lazy_attrs)
+
+
+def __getattr__(name: str):
+    if name not in _lazy_attrs:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    attr = getattr(importlib.import_module(_lazy_attrs[name]), name)
+    globals()[name] = attr
+    return attr
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
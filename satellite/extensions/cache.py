@@ -0,0 +1,173 @@
+"""
+On-disk cache for the `cope` extension results. Each ADM DataFrame is
+stored under a key built from the content hash of the source dataset, the
+ADM and the output options, so a changed input never hits a stale entry.
+The least recently used entries are evicted when the cache exceeds
+`max_size` bytes.
+
+Usage:
+```
+CopeExtension.enable_cache()  # ~/.cache/satellite/cope, 1GiB
+ds.cope.to_dataframe(adm)     # computed & stored
+ds.cope.to_dataframe(adm)     # loaded from the cache
+```
+
+NOTE: entries are pickled DataFrames (pandas `to_pickle`), which needs no
+extra dependency. Only point the cache to a directory you trust.
+"""
+
+from typing import Optional, Union
+from importlib import metadata
+from pathlib import Path
+import threading
+import hashlib
+import uuid
+import os
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from loguru import logger
+
+# bump it when the aggregation output changes
+CACHE_VERSION = 1
+
+# eviction removes entries until the cache is below this fraction of its
+# max_size, so a full cache isn't rescanned on every `put`
+EVICT_TO = 0.9
+
+DEFAULT_CACHE_DIR = (
+    Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "satellite" / "cope"
+)
+
+
+def dataset_hash(ds: xr.Dataset) -> str:
+    """Content hash of the variables and coordinates of a dataset"""
+    h = hashlib.blake2b(digest_size=20)
+    for name in sorted(map(str, ds.variables)):
+        var = ds.variables[name]
+        h.update(f"{name}{var.dims}{var.dtype}{var.shape}".encode())
+        values = np.ascontiguousarray(var.values)
+        if values.dtype.kind == "O":
+            h.update(str(values.tolist()).encode())
+        else:
+            h.update(values.reshape(-1).view(np.uint8))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    The total size is scanned once and then tracked in memory; the
+    directory is only rescanned when it exceeds `max_size`, which also
+    accounts for entries written by other processes.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_CACHE_DIR,
+        max_size: int = 2**30,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def __repr__(self) -> str:
+        return f"ResultCache('{self.path}', max_size={self.max_size})"
+
+    @staticmethod
+    def key(ds_hash: str, adm, **options) -> str:
+        try:
+            version = metadata.version("satellite-weather-downloader")
+        except metadata.PackageNotFoundError:
+            version = None
+        parts = [
+            CACHE_VERSION,
+            version,
+            ds_hash,
+            type(adm).__name__,
+            adm.code,
+            getattr(adm, "adm0", None),
+            getattr(adm, "adm1", None),
+            sorted(options.items()),
+        ]
+        return hashlib.blake2b(
+            repr([str(p) for p in parts]).encode(), digest_size=20
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        fpath = self._fpath(key)
+        try:
+            df = pd.read_pickle(fpath)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # truncated or corrupt entry, e.g. from an interrupted writer
+            logger.warning(f"dropping unreadable cache entry {fpath}")
+            fpath.unlink(missing_ok=True)
+            return None
+
+        try:
+            os.utime(fpath)  # LRU: mtime is the last access
+        except FileNotFoundError:
+            pass  # evicted meanwhile, the data was already read
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        fpath = self._fpath(key)
+        tmp = fpath.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        df.to_pickle(tmp)
+        size = tmp.stat().st_size
+        try:
+            replaced = fpath.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp, fpath)
+
+        with self._lock:
+            self._size += size - replaced
+            if self._size > self.max_size:
+                self._evict(keep=fpath)
+
+    def evict(self) -> None:
+        with self._lock:
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for fpath in self.path.glob("*.pkl"):
+                fpath.unlink(missing_ok=True)
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _evict(self, keep: Optional[Path] = None) -> None:
+        """Removes the least recently used entries, except `keep`"""
+        entries = self._entries()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        if size > self.max_size:
+            for _, entry_size, fpath in sorted(entries):
+                if size <= self.max_size * EVICT_TO:
+                    break
+                if keep is not None and Path(fpath) == keep:
+                    continue
+                Path(fpath).unlink(missing_ok=True)
+                size -= entry_size
+        self._size = size
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _fpath(self, key: str) -> Path:
+        return self.path / f"{key}.pkl"
@@ -8,7 +8,10 @@ import xagg as xa
 from loguru import logger
 from epiweeks import Week
 
+from satellite import metrics
+from satellite.extensions.cache import ResultCache, dataset_hash, DEFAULT_CACHE_DIR
 from satellite.geo.models import ADM, ADMBase
+from satellite.geo.constants import SIMPLIFY_FRACTION
 
 xr.set_options(keep_attrs=True)
 
@@ -47,11 +50,13 @@ class CopeExtensionBase(ABC):
     """
 
     @abstractmethod
-    def to_dataframe(self, adms: Union[list[ADM], ADM]) -> pd.DataFrame:
+    def to_dataframe(
+        self, adms: Union[list[ADM], ADM], simplify: bool = True
+    ) -> pd.DataFrame:
         pass
 
     @abstractmethod
-    def adm_ds(self, adm: ADM) -> xr.Dataset:
+    def adm_ds(self, adm: ADM, simplify: bool = True) -> xr.Dataset:
         pass
 
     @abstractmethod
@@ -67,14 +72,38 @@ class CopeExtensionBase(ABC):
 
 @xr.register_dataset_accessor("cope")
 class CopeExtension(CopeExtensionBase):
+    # Opt-in results cache, shared by every dataset. See `enable_cache`
+    _cache: Optional[ResultCache] = None
+
     def __init__(self, xarray_ds: xr.Dataset):
         self._ds = xarray_ds
+        self._ds_hash: Optional[str] = None
+
+    @classmethod
+    def enable_cache(
+        cls, path: str = DEFAULT_CACHE_DIR, max_size: int = 2**30
+    ) -> ResultCache:
+        """
+        Caches the ADM DataFrames on disk (`max_size` bytes), keyed by the
+        content of the dataset, the ADM and the output options. Applies to
+        `to_dataframe` and `to_sql`.
+        NOTE: the dataset content is hashed once per dataset object, modifying
+        a dataset in place after its first use will not invalidate its entries
+        """
+        cls._cache = ResultCache(path=path, max_size=max_size)
+        return cls._cache
+
+    @classmethod
+    def disable_cache(cls) -> None:
+        cls._cache = None
 
-    def to_dataframe(self, adms: Union[list[ADM], ADM]) -> pd.DataFrame:
+    def to_dataframe(
+        self, adms: Union[list[ADM], ADM], simplify: bool = True
+    ) -> pd.DataFrame:
         adms = [adms] if isinstance(adms, ADMBase) else adms
         dfs = []
         for adm in adms:
-            dfs.append(_adm_to_dataframe(self._ds, adm=adm))
+            dfs.append(self._adm_dataframe(adm=adm, simplify=simplify))
         return pd.concat(dfs, ignore_index=True)
 
     def to_sql(
@@ -85,11 +114,12 @@ class CopeExtension(CopeExtensionBase):
         schema: Optional[str] = None,
         raw: bool = False,
         verbose: bool = True,
+        simplify: bool = True,
     ) -> None:
         adms = [adms] if isinstance(adms, ADMBase) else adms
         for adm in adms:
             _geocode_to_sql(
-                dataset=self._ds,
+                df=self._adm_dataframe(adm=adm, simplify=simplify),
                 adm=adm,
                 con=con,
                 schema=schema,
@@ -101,30 +131,56 @@ class CopeExtension(CopeExtensionBase):
                     f"{schema + '.' if schema else ''}{tablename}"
                 )
 
-    def adm_ds(self, adm: ADM):
-        return _adm_ds(ds=self._ds, adm=adm)
+    def adm_ds(self, adm: ADM, simplify: bool = True):
+        return _adm_ds(ds=self._ds, adm=adm, simplify=simplify)
+
+    def _adm_dataframe(self, adm: ADM, simplify: bool = True) -> pd.DataFrame:
+        cache = self._cache
+        if cache is None:
+            return _adm_to_dataframe(dataset=self._ds, adm=adm, simplify=simplify)
+
+        if self._ds_hash is None:
+            self._ds_hash = dataset_hash(self._ds)
+
+        key = cache.key(
+            self._ds_hash,
+            adm,
+            simplify=simplify,
+            simplify_fraction=SIMPLIFY_FRACTION,
+        )
+        df = cache.get(key)
+        if df is not None:
+            metrics.count("cache_hits")
+            return df
+
+        df = _adm_to_dataframe(dataset=self._ds, adm=adm, simplify=simplify)
+        cache.put(key, df)
+        return df
 
 
 def _geocode_to_sql(
-    dataset: xr.Dataset,
+    df: pd.DataFrame,
     adm: ADM,
     con,
     schema: str,
     tablename: str,
 ) -> None:
-    df = _adm_to_dataframe(dataset=dataset, adm=adm)
-    df.to_sql(
-        name=tablename,
-        schema=schema,
-        con=con,
-        if_exists="append",
-        index=False,
-    )
+    with metrics.span("cope.to_sql", adm=str(adm.code)):
+        df.to_sql(
+            name=tablename,
+            schema=schema,
+            con=con,
+            if_exists="append",
+            index=False,
+        )
+    metrics.count("rows_written", len(df))
     del df
 
 
-def _adm_to_dataframe(dataset: xr.Dataset, adm: ADM) -> pd.DataFrame:
-    ds = _adm_ds(ds=dataset, adm=adm)
+def _adm_to_dataframe(
+    dataset: xr.Dataset, adm: ADM, simplify: bool = True
+) -> pd.DataFrame:
+    ds = _adm_ds(ds=dataset, adm=adm, simplify=simplify)
     df = ds.to_dataframe().reset_index()
     del ds
     df = df.drop(columns=["poly_idx", "name"])
@@ -134,24 +190,59 @@ def _adm_to_dataframe(dataset: xr.Dataset, adm: ADM) -> pd.DataFrame:
     )
     df[columns_to_round] = df[columns_to_round].apply(lambda x: np.round(x, 4))
     df = df.rename(columns={"time": "date", "code": "geocode"})
+    metrics.count("adms_processed")
     return df
 
 
-def _adm_ds(ds: xr.Dataset, adm: ADM) -> xr.Dataset:
-    ds = _convert_units(ds)
-    weightmap = xa.pixel_overlaps(ds, adm.to_dataframe(), silent=True)
-    ds = xa.aggregate(ds, weightmap, silent=True).to_dataset().sortby("time")
-    gb = ds.resample(time="1D")
-    gmin, gmean, gmax, gtot = (
-        _reduce_by(gb, np.min, "min"),
-        _reduce_by(gb, np.mean, "med"),
-        _reduce_by(gb, np.max, "max"),
-        _reduce_by(gb, np.sum, "tot"),
+def _adm_ds(ds: xr.Dataset, adm: ADM, simplify: bool = True) -> xr.Dataset:
+    tolerance = _grid_tolerance(ds) if simplify else None
+    code = str(adm.code)
+    with metrics.span("cope.convert_units", adm=code):
+        ds = _convert_units(ds)
+    with metrics.span("geo.adm_geometry", adm=code):
+        gdf = adm.to_dataframe(tolerance)
+    with metrics.span("cope.pixel_overlaps", adm=code):
+        weightmap = xa.pixel_overlaps(ds, gdf, silent=True)
+    with metrics.span("cope.aggregate", adm=code):
+        ds = xa.aggregate(ds, weightmap, silent=True).to_dataset().sortby("time")
+        gb = ds.resample(time="1D")
+        gmin, gmean, gmax, gtot = (
+            _reduce_by(gb, np.min, "min"),
+            _reduce_by(gb, np.mean, "med"),
+            _reduce_by(gb, np.max, "max"),
+            _reduce_by(gb, np.sum, "tot"),
+        )
+        coords = [ds.code, ds.name, gmin, gmean, gmax]
+        if "precip_tot" in gtot.data_vars:
+            coords.append(gtot.precip_tot)
+        return xr.combine_by_coords(coords, data_vars="all")
+
+
+def _grid_tolerance(ds: xr.Dataset) -> Optional[float]:
+    """
+    Simplification tolerance (degrees) for the ADM geometries, tied to the
+    dataset grid spacing `d` as `SIMPLIFY_FRACTION * d`.
+
+    A topology-preserving simplification with tolerance `t` keeps every
+    boundary point within `t` of the original boundary, so the overlap area
+    of a pixel changes by at most ~`t * L`, where `L` is the length of the
+    ADM boundary inside that pixel; pixels the boundary doesn't cross are
+    unaffected. `L` is not bounded by the pixel size: detailed coastlines
+    and rivers fold many times inside a pixel, so no fixed percentage
+    holds. For ERA5-Land (0.1°) the tolerance is 0.005° (~550m).
+    """
+    spacing = min(
+        (
+            float(np.abs(np.diff(ds[coord].values)).min())
+            for coord in ("latitude", "longitude")
+            if coord in ds.coords and ds[coord].size > 1
+        ),
+        default=0.0,
     )
-    coords = [ds.code, ds.name, gmin, gmean, gmax]
-    if "precip_tot" in gtot.data_vars:
-        coords.append(gtot.precip_tot)
-    return xr.combine_by_coords(coords, data_vars="all")
+    if not spacing:
+        return None
+    # rounded to keep the per-tolerance geometry cache small
+    return round(spacing * SIMPLIFY_FRACTION, 6)
 
 
 def _reduce_by(ds: xr.Dataset, func, prefix: str) -> xr.Dataset:
@@ -3,3 +3,7 @@ from pathlib import Path
 BASE_DIR = Path(__file__).parent.parent
 ADM_DB = BASE_DIR / "data/ADM.duckdb"
 GPKGS_DIR = BASE_DIR / "data/gpkgs/"
+
+# Fraction of the dataset grid spacing used as simplification tolerance for
+# the ADM geometries when computing pixel overlaps. See `cope._grid_tolerance`
+SIMPLIFY_FRACTION = 0.05
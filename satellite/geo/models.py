@@ -1,16 +1,18 @@
 __all__ = ["ADM0", "ADM1", "ADM2"]
 
-from typing import TypeVar, Type, List, Optional
+from typing import TYPE_CHECKING, TypeVar, Type, List, Optional
 from inspect import get_annotations
 from functools import lru_cache
 from abc import ABC, abstractmethod
 
-import pandas as pd
-import geopandas as gpd
 import duckdb
 
 from satellite.geo import functional, constants
 
+if TYPE_CHECKING:
+    # NOTE: geopandas is only imported when the geometries are required
+    import geopandas as gpd
+
 
 ADM = TypeVar("ADM", bound="ADMBase")
 
@@ -32,7 +34,13 @@ class ADMBase(ABC):
         return self.name
 
     @abstractmethod
-    def to_dataframe(self) -> gpd.GeoDataFrame: ...
+    def to_dataframe(self, tolerance: Optional[float] = None) -> "gpd.GeoDataFrame":
+        """
+        Returns the ADM geometry as a single row GeoDataFrame. If `tolerance`
+        (in degrees) is given, the geometry is simplified preserving its
+        topology; no boundary point moves further than `tolerance` from the
+        original shape. See `_read_gpkg`.
+        """
 
     @classmethod
     def get(cls: Type[ADM], **params) -> Type[ADM]:
@@ -81,7 +89,19 @@ class ADMBase(ABC):
 
     @staticmethod
     @lru_cache(maxsize=None)
-    def _read_gpkg(locale) -> gpd.GeoDataFrame:
+    def _read_gpkg(locale, tolerance: Optional[float] = None) -> "gpd.GeoDataFrame":
+        # NOTE: cached per (locale, tolerance). Simplification is applied to
+        # the whole locale at once, so every ADM sharing a tolerance reuses it.
+        # Each polygon is simplified on its own, shared borders may drift
+        # apart; dissolved ADMs must use `_read_dissolved` instead
+        if tolerance:
+            df = ADMBase._read_gpkg(locale).copy()
+            df["geometry"] = df.geometry.simplify(tolerance, preserve_topology=True)
+            return df
+
+        import pandas as pd
+        import geopandas as gpd
+
         if locale == "BRA":
             chunks = constants.GPKGS_DIR / "BRA"
             dfs = []
@@ -93,6 +113,24 @@ class ADMBase(ABC):
             df = gpd.read_file(str(gpkg), encoding="utf-8")
         return df
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _read_dissolved(
+        locale, adm1: Optional[str] = None, tolerance: Optional[float] = None
+    ) -> "gpd.GeoDataFrame":
+        # NOTE: dissolved at full resolution and then simplified, so the
+        # internal borders don't leave sliver holes in the ADM geometry
+        if tolerance:
+            gdf = ADMBase._read_dissolved(locale, adm1).copy()
+            gdf["geometry"] = gdf.geometry.simplify(tolerance, preserve_topology=True)
+            return gdf
+
+        gdf = ADMBase._read_gpkg(locale)
+        if adm1 is None:
+            return gdf.dissolve()
+        gdf = gdf[gdf["adm1"] == adm1]
+        return gdf.dissolve(by="adm1", as_index=False).reset_index(drop=True)
+
     @classmethod
     def create_table(cls):
         fields = cls._get_class_fields(cls.__fields__)
@@ -146,9 +184,8 @@ class ADM0(ADMBase):
     def __init__(self) -> None:
         raise ValueError("bad ADM0 instantiation, use ADM0.get() instead")
 
-    def to_dataframe(self) -> gpd.GeoDataFrame:
-        gdf = self._read_gpkg(self.code)
-        gdf = gdf.dissolve()
+    def to_dataframe(self, tolerance: Optional[float] = None) -> "gpd.GeoDataFrame":
+        gdf = self._read_dissolved(self.code, None, tolerance)
         if len(gdf) != 1:
             raise ValueError("expects only one row as output")
         res = gdf.copy().drop(columns=["adm2", "adm1"])
@@ -168,11 +205,9 @@ class ADM1(ADMBase):
     def __init__(self) -> None:
         raise ValueError("bad ADM1 initialization, use ADM1.get() instead")
 
-    def to_dataframe(self) -> gpd.GeoDataFrame:
+    def to_dataframe(self, tolerance: Optional[float] = None) -> "gpd.GeoDataFrame":
         adm0 = self.adm0.code if isinstance(self.adm0, ADM0) else self.adm0
-        gdf = self._read_gpkg(adm0)
-        gdf = gdf[gdf["adm1"] == self.code]
-        gdf = gdf.dissolve(by="adm1", as_index=False).reset_index(drop=True)
+        gdf = self._read_dissolved(adm0, self.code, tolerance)
         if len(gdf) != 1:
             raise ValueError("expects only one row as output")
         res = gdf.copy().drop(columns=["adm2"])
@@ -201,10 +236,10 @@ class ADM2(ADMBase):
     def __init__(self) -> None:
         raise ValueError("bad ADM2 initialization, use ADM2.get() instead")
 
-    def to_dataframe(self) -> gpd.GeoDataFrame:
+    def to_dataframe(self, tolerance: Optional[float] = None) -> "gpd.GeoDataFrame":
         adm0 = self.adm0.code if isinstance(self.adm0, ADM0) else self.adm0
         adm1 = self.adm1.code if isinstance(self.adm1, ADM1) else self.adm1
-        gdf = self._read_gpkg(adm0)
+        gdf = self._read_gpkg(adm0, tolerance)
         gdf = gdf[(gdf["adm1"] == adm1) & (gdf["adm2"] == self.code)]
         if len(gdf) != 1:
             raise ValueError("expects only one row as output")
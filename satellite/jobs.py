@@ -0,0 +1,332 @@
+"""
+Batch jobs: downloads ERA5-Land data for a date range and inserts the
+aggregated ADM rows into a database. A job is planned into download units
+(one CDS request per `chunk_days` days) and aggregation units (a batch of
+`adms_per_unit` ADMs of a downloaded file), which run in two thread pools
+so the downloads overlap with the aggregation. Completed units are
+checkpointed in a local state file, a restarted job skips them.
+
+Each ADM is inserted in its own transaction, deleting its rows for the
+unit dates first, so re-running a unit interrupted midway (or a whole
+job) doesn't duplicate rows.
+"""
+
+from typing import Any, Dict, Literal, Optional
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from datetime import date, datetime, timedelta
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+import threading
+import json
+import os
+
+from loguru import logger
+from pydantic import BaseModel, Field, field_validator
+
+from satellite.models import Area, ERA5LandRequest, ERA5LandSpecs, DataSet
+from satellite.geo import models as geo
+
+STATE_FILE = ".satellite-state.json"
+
+
+class JobSpec(BaseModel):
+    date: str = Field(
+        ..., description="ISO date or date range with '/' (e.g. 2023-01-01/2023-01-31)"
+    )
+    adm_level: Literal["ADM0", "ADM1", "ADM2"] = Field(default="ADM2")
+    adms: Dict[str, str] = Field(
+        default={},
+        description="`filter` params for the ADMs, e.g. {'adm0': 'BRA', 'adm1': '33'}",
+    )
+    locale: Optional[Literal["BRA", "ARG"]] = Field(
+        default=None,
+        description="Download area, if neither `locale` or `area` are set, "
+        "the bbox is derived from the ADMs",
+    )
+    area: Optional[Dict[Literal["N", "S", "W", "E"], float]] = Field(default=None)
+    variable: list[str] = Field(default=ERA5LandSpecs.model_fields["variable"].default)
+    time: list[str] = Field(default=ERA5LandSpecs.model_fields["time"].default)
+    db: str = Field(..., description="SQLAlchemy URI of the target database")
+    tablename: str = Field(default="weather")
+    db_schema: Optional[str] = Field(default=None)
+    output_dir: str = Field(default=".", description="Downloaded files directory")
+    state: Optional[str] = Field(
+        default=None, description=f"Checkpoint file, default: output_dir/{STATE_FILE}"
+    )
+    chunk_days: int = Field(default=1, gt=0)
+    adms_per_unit: int = Field(default=100, gt=0)
+    download_workers: int = Field(default=2, gt=0)
+    aggregate_workers: int = Field(default=2, gt=0)
+    format: Literal["grib", "netcdf"] = Field(default="netcdf")
+    api_key: Optional[str] = Field(default=None)
+
+    @field_validator("date")
+    @classmethod
+    def validate_date(cls, value: str) -> str:
+        ini, _, end = value.partition("/")
+        assert date.fromisoformat(ini) <= date.fromisoformat(
+            end or ini
+        ), "`date` range must be in ascending order"
+        return value
+
+    @classmethod
+    def from_file(cls, fpath: str, **overrides) -> "JobSpec":
+        spec = json.loads(Path(fpath).read_text())
+        spec.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**spec)
+
+    @property
+    def state_file(self) -> Path:
+        return Path(self.state or Path(self.output_dir) / STATE_FILE)
+
+
+@dataclass
+class DownloadUnit:
+    id: str
+    date: str
+    output: Path
+
+
+@dataclass
+class AggregateUnit:
+    id: str
+    download: DownloadUnit
+    adms: list[Any] = field(repr=False)
+
+
+class State:
+    """Completed units checkpoint, persisted as JSON after every update"""
+
+    def __init__(self, fpath: Path):
+        self.fpath = Path(fpath)
+        self._lock = threading.Lock()
+        self.units: dict[str, dict] = {}
+        if self.fpath.exists():
+            self.units = json.loads(self.fpath.read_text())["units"]
+
+    def done(self, unit_id: str) -> bool:
+        return unit_id in self.units
+
+    def mark_done(self, unit_id: str, **info) -> None:
+        with self._lock:
+            self.units[unit_id] = {"finished": datetime.now().isoformat(), **info}
+            tmp = self.fpath.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"units": self.units}, indent=1))
+            os.replace(tmp, self.fpath)
+
+
+class Job:
+    def __init__(self, spec: JobSpec):
+        self.spec = spec
+        self.state = State(spec.state_file)
+        # the first insert creates the table, concurrent creations would fail
+        self._table_lock = threading.Lock()
+        self._table_ready = threading.Event()
+
+    @cached_property
+    def adms(self) -> list[Any]:
+        adms = getattr(geo, self.spec.adm_level).filter(**self.spec.adms)
+        if not adms:
+            raise ValueError(
+                f"{self.spec.adm_level} for query {self.spec.adms} not found"
+            )
+        return sorted(adms, key=lambda adm: str(adm.code))
+
+    @cached_property
+    def area(self) -> Optional[dict[str, float]]:
+        if self.spec.locale:
+            return None
+        if self.spec.area:
+            return self.spec.area
+        return dict(zip("NWSE", Area.from_adms(self.adms).bbox))
+
+    def plan(self) -> list[tuple[DownloadUnit, list[AggregateUnit]]]:
+        spec = self.spec
+        adms = self.adms
+        batches = [
+            adms[i : i + spec.adms_per_unit]
+            for i in range(0, len(adms), spec.adms_per_unit)
+        ]
+        ini, _, end = spec.date.partition("/")
+        ini, end = date.fromisoformat(ini), date.fromisoformat(end or ini)
+
+        plan = []
+        while ini <= end:
+            last = min(ini + timedelta(days=spec.chunk_days - 1), end)
+            dates = f"{ini}/{last}"
+            download = DownloadUnit(
+                id=f"download:{dates}",
+                date=dates,
+                output=Path(spec.output_dir) / f"era5_land_{ini}_{last}",
+            )
+            aggregates = [
+                AggregateUnit(
+                    id=(
+                        f"aggregate:{dates}:{spec.adm_level}:"
+                        f"{batch[0].code}-{batch[-1].code}"
+                    ),
+                    download=download,
+                    adms=batch,
+                )
+                for batch in batches
+            ]
+            plan.append((download, aggregates))
+            ini = last + timedelta(days=1)
+        return plan
+
+    def run(self) -> int:
+        """Runs the pending units, returns the number of failed units"""
+        from sqlalchemy import create_engine
+
+        spec = self.spec
+        Path(spec.output_dir).mkdir(parents=True, exist_ok=True)
+        engine = create_engine(spec.db)
+
+        pending = []
+        for download, aggregates in self.plan():
+            todo = [u for u in aggregates if not self.state.done(u.id)]
+            if todo:
+                pending.append((download, todo))
+            else:
+                logger.info(f"{download.date} already processed, skipping")
+
+        if pending:
+            self.area  # derived once, before the download threads start
+
+        # back-pressure: at most this many downloaded datasets kept in memory
+        in_memory = threading.BoundedSemaphore(
+            spec.download_workers + spec.aggregate_workers
+        )
+        failed = 0
+
+        with ThreadPoolExecutor(
+            spec.download_workers, thread_name_prefix="download"
+        ) as downloads, ThreadPoolExecutor(
+            spec.aggregate_workers, thread_name_prefix="aggregate"
+        ) as aggregations:
+            download_futures: dict[Future, tuple] = {
+                downloads.submit(self._hold_download, download, in_memory): (
+                    download,
+                    todo,
+                )
+                for download, todo in pending
+            }
+            aggregate_futures: dict[Future, AggregateUnit] = {}
+
+            for future in as_completed(download_futures):
+                download, todo = download_futures.pop(future)
+                try:
+                    ds = future.result()
+                except Exception as e:
+                    logger.error(f"{download.id} failed: {e!r}")
+                    failed += len(todo) + 1
+                    continue
+
+                # releases this download slot once all its units finished,
+                # bound per download: the loop moves on before they do
+                remaining = _Countdown(len(todo), in_memory.release)
+                for unit in todo:
+                    agg_future = aggregations.submit(self._aggregate, unit, ds, engine)
+                    agg_future.add_done_callback(lambda _, r=remaining: r.tick())
+                    aggregate_futures[agg_future] = unit
+                del ds
+
+            for future in as_completed(aggregate_futures):
+                unit = aggregate_futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"{unit.id} failed: {e!r}")
+                    failed += 1
+
+        engine.dispose()
+        return failed
+
+    def _hold_download(self, unit: DownloadUnit, in_memory: threading.Semaphore):
+        """
+        Downloads and opens a unit, holding an `in_memory` slot until all its
+        aggregation units finish (released by `run`) or the download fails
+        """
+        in_memory.acquire()
+        try:
+            return self._download(unit)
+        except BaseException:
+            in_memory.release()
+            raise
+
+    def _download(self, unit: DownloadUnit):
+        request = ERA5LandRequest(
+            api_key=self.spec.api_key,
+            request=ERA5LandSpecs(
+                variable=self.spec.variable,
+                date=unit.date,
+                time=self.spec.time,
+                format=self.spec.format,
+                locale=self.spec.locale,
+                area=self.area,
+            ),
+        )
+        fpath = request.download(str(unit.output))
+        self.state.mark_done(unit.id, file=fpath)
+        logger.info(f"{unit.id} downloaded: {fpath}")
+        return DataSet.open(fpath).load()
+
+    def _aggregate(self, unit: AggregateUnit, ds, engine) -> None:
+        ini, _, end = unit.download.date.partition("/")
+        for adm in unit.adms:
+            df = ds.cope.to_dataframe(adm)
+            if self._table_ready.is_set():
+                self._replace_rows(df, adm, ini, end, engine)
+            else:
+                with self._table_lock:
+                    self._replace_rows(df, adm, ini, end, engine)
+                    self._table_ready.set()
+        self.state.mark_done(unit.id, adms=len(unit.adms))
+        logger.info(f"{unit.id} inserted into {self.spec.tablename}")
+
+    def _replace_rows(self, df, adm, ini: str, end: str, engine) -> None:
+        """Replaces the ADM rows between `ini` and `end` in one transaction"""
+        import sqlalchemy as sa
+
+        from satellite.extensions.cope import _geocode_to_sql
+
+        spec = self.spec
+        table = sa.table(
+            spec.tablename,
+            sa.column("geocode"),
+            sa.column("date"),
+            schema=spec.db_schema,
+        )
+        ini = datetime.fromisoformat(ini)
+        end = datetime.fromisoformat(end) + timedelta(days=1)
+
+        with engine.begin() as conn:
+            if sa.inspect(conn).has_table(spec.tablename, schema=spec.db_schema):
+                conn.execute(
+                    sa.delete(table).where(
+                        table.c.geocode == str(adm.code),
+                        table.c.date >= ini,
+                        table.c.date < end,
+                    )
+                )
+            _geocode_to_sql(
+                df=df,
+                adm=adm,
+                con=conn,
+                schema=spec.db_schema,
+                tablename=spec.tablename,
+            )
+
+
+class _Countdown:
+    def __init__(self, n: int, callback):
+        self.n = n
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def tick(self) -> None:
+        with self._lock:
+            self.n -= 1
+            if self.n == 0:
+                self.callback()
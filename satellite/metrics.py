@@ -0,0 +1,213 @@
+"""
+Instrumentation hooks for the pipeline stages. Each stage runs inside a
+named `span`, measuring its wall time and memory; `count` increments named
+counters (ADMs processed, rows written, bytes downloaded). Spans & counters
+are sent to the registered exporters, with no exporter registered both
+return immediately.
+
+Usage:
+```
+from satellite import metrics
+
+class StatsdExporter(metrics.Exporter):
+    def on_span(self, span):
+        statsd.timing(span.name, span.duration * 1000)
+
+    def on_count(self, name, value, tags):
+        statsd.incr(name, value)
+
+metrics.add_exporter(StatsdExporter())
+```
+
+Spans:
+    request.download   : CDS request, queue and transfer
+    dataset.unzip      : reading/extracting the zipped download
+    dataset.open       : opening the dataset
+    cope.convert_units : `_convert_units`
+    geo.adm_geometry   : reading (& simplifying) the ADM geometry
+    cope.pixel_overlaps: `xa.pixel_overlaps`
+    cope.aggregate     : `xa.aggregate` and daily reductions
+    cope.to_sql        : inserting the ADM rows in the database
+
+Counters:
+    bytes_downloaded, adms_processed, rows_written, cache_hits
+"""
+
+from typing import Optional
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from collections import defaultdict
+import threading
+import time
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_exporters: list["Exporter"] = []
+_current_span: ContextVar[Optional[str]] = ContextVar("span", default=None)
+_noop = nullcontext()
+
+
+@dataclass
+class Span:
+    """
+    name          : stage name, e.g. `cope.pixel_overlaps`
+    tags          : extra labels, e.g. {"adm": "3304557"}
+    parent        : name of the enclosing span, if any
+    start         : unix timestamp of the span start
+    duration      : wall time in seconds
+    peak_rss      : process peak resident set size (bytes) at the span end.
+                    It is the high-water mark of the whole process since it
+                    started, not the peak of this stage
+    peak_rss_delta: how much the process peak RSS grew within the span. A
+                    stage that stays below a previous peak reports 0, and
+                    with concurrent stages (e.g. the `satellite.jobs`
+                    thread pools) the growth may come from another thread,
+                    so it can't be attributed to a single stage
+    error         : exception class name if the stage failed
+    """
+
+    name: str
+    tags: dict = field(default_factory=dict)
+    parent: Optional[str] = None
+    start: float = 0.0
+    duration: float = 0.0
+    peak_rss: Optional[int] = None
+    peak_rss_delta: Optional[int] = None
+    error: Optional[str] = None
+
+
+class Exporter:
+    """
+    Base exporter, override `on_span` and/or `on_count` to forward the
+    metrics. Exporters may be called from multiple threads. Exceptions
+    raised by an exporter are logged and ignored, they never fail a stage.
+    """
+
+    def on_span(self, span: Span) -> None: ...
+
+    def on_count(self, name: str, value: int, tags: dict) -> None: ...
+
+
+class MemoryExporter(Exporter):
+    """Keeps spans and counter totals in memory, see `summary()`"""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self.counters: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def on_span(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def on_count(self, name: str, value: int, tags: dict) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def summary(self) -> dict:
+        """Total & max wall time, max peak RSS and calls per span name"""
+        stages = {}
+        with self._lock:
+            for span in self.spans:
+                stage = stages.setdefault(
+                    span.name, {"calls": 0, "total": 0.0, "max": 0.0, "peak_rss": 0}
+                )
+                stage["calls"] += 1
+                stage["total"] += span.duration
+                stage["max"] = max(stage["max"], span.duration)
+                stage["peak_rss"] = max(stage["peak_rss"], span.peak_rss or 0)
+            return {"stages": stages, "counters": dict(self.counters)}
+
+
+class LoggerExporter(Exporter):
+    """Logs every span and counter with loguru at `level`"""
+
+    def __init__(self, level: str = "DEBUG"):
+        from loguru import logger
+
+        self.logger = logger
+        self.level = level
+
+    def on_span(self, span: Span) -> None:
+        rss = f", peak RSS {span.peak_rss / 2**20:.1f}MiB" if span.peak_rss else ""
+        self.logger.log(
+            self.level, f"{span.name} {span.tags} took {span.duration:.3f}s{rss}"
+        )
+
+    def on_count(self, name: str, value: int, tags: dict) -> None:
+        self.logger.log(self.level, f"{name} +{value} {tags}")
+
+
+def add_exporter(exporter: Exporter) -> Exporter:
+    if exporter not in _exporters:
+        _exporters.append(exporter)
+    return exporter
+
+
+def remove_exporter(exporter: Exporter) -> None:
+    if exporter in _exporters:
+        _exporters.remove(exporter)
+
+
+def enabled() -> bool:
+    return bool(_exporters)
+
+
+def span(name: str, **tags):
+    """Context manager measuring the stage `name`"""
+    if not _exporters:
+        return _noop
+    return _span(name, tags)
+
+
+def count(name: str, value: int = 1, **tags) -> None:
+    if not _exporters:
+        return
+    for exporter in list(_exporters):
+        try:
+            exporter.on_count(name, value, tags)
+        except Exception:
+            _exporter_error(exporter)
+
+
+@contextmanager
+def _span(name: str, tags: dict):
+    sp = Span(name=name, tags=tags, parent=_current_span.get(), start=time.time())
+    token = _current_span.set(name)
+    rss_before = _peak_rss()
+    start = time.perf_counter()
+    try:
+        yield sp
+    except BaseException as e:
+        sp.error = type(e).__name__
+        raise
+    finally:
+        sp.duration = time.perf_counter() - start
+        sp.peak_rss = _peak_rss()
+        if sp.peak_rss is not None:
+            sp.peak_rss_delta = sp.peak_rss - rss_before
+        _current_span.reset(token)
+        for exporter in list(_exporters):
+            try:
+                exporter.on_span(sp)
+            except Exception:
+                _exporter_error(exporter)
+
+
+def _exporter_error(exporter: Exporter) -> None:
+    from loguru import logger
+
+    logger.opt(exception=True).warning(f"metrics exporter {exporter!r} failed")
+
+
+def _peak_rss() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -1,32 +1,52 @@
 from datetime import date, datetime, timedelta
-from typing import Dict, Literal, Optional
+from typing import TYPE_CHECKING, Any, Dict, Literal, Optional, Union
+from collections import OrderedDict
 from abc import ABC, abstractmethod
 from pathlib import Path
+import itertools
+import hashlib
 import zipfile
+import math
 import uuid
 import os
 import io
 
 from pydantic import BaseModel, Field, field_validator, ValidationInfo
 from requests.exceptions import RequestException
-from dotenv import load_dotenv
-from cdsapi.api import Client
-import xarray as xr
 
-load_dotenv()
+from satellite import metrics
+
+if TYPE_CHECKING:
+    # NOTE: cdsapi and xarray are imported when downloading/opening the data
+    from cdsapi.api import Client
+    import xarray as xr
+
+GRIB_SUFFIXES = (".grib", ".grb", ".grib2")
+
+# Extracted GRIB files and its cfgrib message indexes
+GRIB_CACHE_DIR = (
+    Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "satellite" / "grib"
+)
+# Least recently used extracted GRIBs are removed past this size (bytes)
+GRIB_CACHE_MAX_SIZE = 10 * 2**30
 
 
 class Area:
+    # Custom areas are kept in a bounded registry, the least recently used
+    # bbox is dropped when MAX_CUSTOM_AREAS is reached
+    MAX_CUSTOM_AREAS = 128
+
     def __init__(self, locale: Optional[str] = None):
         if locale:
             locale = locale.upper()
-            if locale not in self.areas:
+            if locale not in self.areas and locale not in self._custom_areas:
                 raise ValueError(
                     "Unkown locale. Please use the predefined areas"
                     "or Area.from_coords() function. Pre-defined locales: "
                     f"{list(self.areas)}"
                 )
         self.locale = locale
+        self._bbox = dict(self.areas.get(locale) or self._custom_areas[locale])
 
     def __repr__(self) -> str:
         return f"Area('{self.locale}')"
@@ -36,10 +56,12 @@ class Area:
         "BRA": {"N": 5.5, "W": -74.0, "S": -33.75, "E": -32.25},
         "ARG": {"N": -21.0, "W": -74.0, "S": -56.0, "E": -53.0},
     }
+    _custom_areas: "OrderedDict[str, dict[str, float]]" = OrderedDict()
+    _custom_ids = itertools.count()
 
     @property
     def bbox(self):
-        c = self.areas[self.locale]
+        c = self._bbox
         return [c["N"], c["W"], c["S"], c["E"]]
 
     @classmethod
@@ -53,10 +75,53 @@ class Area:
             if area == bbox:
                 return cls(name)
 
-        custom = f"CUSTOM_{len(cls.areas)}"
-        cls.areas[custom] = bbox
+        for name, area in cls._custom_areas.items():
+            if area == bbox:
+                cls._custom_areas.move_to_end(name)
+                return cls(name)
+
+        custom = f"CUSTOM_{next(cls._custom_ids)}"
+        cls._custom_areas[custom] = bbox
+        while len(cls._custom_areas) > cls.MAX_CUSTOM_AREAS:
+            cls._custom_areas.popitem(last=False)
         return cls(custom)
 
+    @classmethod
+    def from_adms(cls, adms: list, resolution: float = 0.1) -> "Area":
+        """
+        Tightest bbox aligned to a grid of `resolution` degrees (ERA5-Land
+        by default) covering every pixel that intersects the ADMs geometries.
+        Pixels are centered on the grid points, a pixel intersects the ADMs
+        if its center is less than half a pixel away from the bounds, so the
+        bounds are padded by half a pixel and snapped inwards to the grid.
+        Pixels that only touch the bounds are left out.
+        """
+        if not adms:
+            raise ValueError("at least one ADM must be provided")
+
+        bounds = [adm.to_dataframe().total_bounds for adm in adms]
+        west = min(b[0] for b in bounds)
+        south = min(b[1] for b in bounds)
+        east = max(b[2] for b in bounds)
+        north = max(b[3] for b in bounds)
+
+        pad = resolution / 2
+
+        def below(coord: float) -> float:
+            # last grid point strictly below coord
+            return round((math.ceil(round(coord / resolution, 6)) - 1) * resolution, 6)
+
+        def above(coord: float) -> float:
+            # first grid point strictly above coord
+            return round((math.floor(round(coord / resolution, 6)) + 1) * resolution, 6)
+
+        return cls.from_coords(
+            north=min(below(north + pad), 90.0),
+            west=max(above(west - pad), -180.0),
+            south=max(above(south - pad), -90.0),
+            east=min(below(east + pad), 180.0),
+        )
+
     @classmethod
     def _validate_bbox(cls, bbox: dict[str, float]) -> None:
         if abs(bbox["N"]) > 90 or abs(bbox["S"]) > 90:
@@ -81,8 +146,12 @@ class BaseRequest(ABC, BaseModel):
     def download(self, output: str) -> str: ...
 
     @classmethod
-    def get_client(cls, key: Optional[str] = None) -> Client:
+    def get_client(cls, key: Optional[str] = None) -> "Client":
+        from cdsapi.api import Client
+        from dotenv import load_dotenv
+
         if not key:
+            load_dotenv()
             key = os.getenv("CDSAPI_TOKEN", None)
             if not key:
                 raise ValueError(
@@ -154,6 +223,14 @@ class ERA5LandSpecs(Specs):
         ),
         validate_default=True,
     )
+    adms: Optional[list[Any]] = Field(
+        default=None,
+        description=(
+            "Auto set `area` to the smallest grid-aligned bbox covering a list"
+            " of ADMs (e.g. [ADM1.get(code='33', adm0='BRA')]). See "
+            "Area.from_adms"
+        ),
+    )
     area: Optional[Dict[Literal["N", "S", "W", "E"], float]] = Field(
         default=None,
         description=(
@@ -203,6 +280,17 @@ class ERA5LandSpecs(Specs):
             ], f"invalid hour {hour}. e.g '23:00'"
         return value
 
+    @field_validator("adms")
+    @classmethod
+    def validate_adms(cls, value: Optional[list[Any]]) -> Optional[list[Any]]:
+        from satellite.geo.models import ADMBase
+
+        if value is not None:
+            assert value, "`adms` must be a non empty list of ADMs"
+            for adm in value:
+                assert isinstance(adm, ADMBase), f"{adm!r} is not an ADM"
+        return value
+
     @field_validator("area")
     @classmethod
     def validate_area(
@@ -218,6 +306,10 @@ class ERA5LandSpecs(Specs):
                 east=value["E"],
             ).bbox
 
+        adms = values.data.get("adms")
+        if adms:
+            return Area.from_adms(adms).bbox
+
         locale = values.data["locale"]
         if locale:
             return Area(locale).bbox
@@ -254,35 +346,206 @@ class ERA5LandRequest(BaseRequest):
         client = self.get_client(self.api_key)
 
         try:
-            client.retrieve(
-                self.name,
-                {
-                    "product_type": request.product_type,
-                    "variable": request.variable,
-                    "date": request.date,
-                    "time": request.time,
-                    "area": request.area,
-                    "format": request.format,
-                    "download_format": request.download_format,
-                },
-                str(output),
-            )
+            with metrics.span("request.download", dataset=self.name):
+                client.retrieve(
+                    self.name,
+                    {
+                        "product_type": request.product_type,
+                        "variable": request.variable,
+                        "date": request.date,
+                        "time": request.time,
+                        "area": request.area,
+                        "format": request.format,
+                        "download_format": request.download_format,
+                    },
+                    str(output),
+                )
         except (RequestException, KeyboardInterrupt) as e:
             output.unlink(missing_ok=True)
             raise e
 
+        metrics.count("bytes_downloaded", output.stat().st_size)
         return str(output)
 
 
 class DataSet:
     @classmethod
-    def from_netcdf(cls, fpath: str) -> xr.Dataset:
+    def open(cls, fpath: str) -> "xr.Dataset":
+        """Opens a NetCDF or GRIB download, single or zipped"""
+        if _is_grib(fpath):
+            return cls.from_grib(fpath)
+        return cls.from_netcdf(fpath)
+
+    @classmethod
+    def from_netcdf(cls, fpath: str) -> "xr.Dataset":
+        import xarray as xr
+
+        # registers the `ds.cope` accessor
+        import satellite.extensions.cope  # noqa
+
         if Path(fpath).suffix == ".zip":
             with zipfile.ZipFile(fpath, "r") as zip_files:
                 zfiles = zip_files.namelist()
                 if len(zfiles) != 1:
                     raise ValueError(f"multiple or no data found in {fpath}")
-                with zip_files.open(zfiles[0]) as zfile:
-                    data = zfile.read()
+                with metrics.span("dataset.unzip", file=str(fpath)):
+                    with zip_files.open(zfiles[0]) as zfile:
+                        data = zfile.read()
+                with metrics.span("dataset.open", file=str(fpath)):
                     return xr.open_dataset(io.BytesIO(data), engine="h5netcdf")
-        return xr.open_dataset(fpath, engine="netcdf4")
+        with metrics.span("dataset.open", file=str(fpath)):
+            return xr.open_dataset(fpath, engine="netcdf4")
+
+    @classmethod
+    def from_grib(
+        cls,
+        fpath: str,
+        cache_dir: Union[str, Path] = GRIB_CACHE_DIR,
+        max_cache_size: int = GRIB_CACHE_MAX_SIZE,
+    ) -> "xr.Dataset":
+        """
+        Opens a GRIB file (or a zip of GRIB files) with cfgrib. The message
+        indexes are persisted in `cache_dir`, so reopening a file skips its
+        scan; zipped files are extracted there once, named after their CRC.
+        The least recently used extracted files (and its indexes) are removed
+        when they exceed `max_cache_size` bytes. The variables and coordinates
+        are normalized to the NetCDF layout (`valid_time`, `latitude`,
+        `longitude`, `t2m`, `tp`, ...).
+        """
+        try:
+            import cfgrib
+        except ImportError as e:
+            raise ImportError(
+                "GRIB files require cfgrib (and ecCodes): `pip install "
+                "satellite-weather-downloader[grib]` or "
+                "`conda install -c conda-forge cfgrib`"
+            ) from e
+        import xarray as xr
+
+        # registers the `ds.cope` accessor
+        import satellite.extensions.cope  # noqa
+
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+        if Path(fpath).suffix == ".zip":
+            with metrics.span("dataset.unzip", file=str(fpath)):
+                gribs = _extract_gribs(fpath, cache_dir)
+                _evict_gribs(cache_dir, max_cache_size, keep=gribs)
+        else:
+            gribs = [Path(fpath)]
+
+        datasets = []
+        with metrics.span("dataset.open", file=str(fpath)):
+            for grib in gribs:
+                path_hash = hashlib.md5(str(grib.resolve()).encode()).hexdigest()[:8]
+                indexpath = str(
+                    cache_dir / f"{grib.name}.{path_hash}.{{short_hash}}.idx"
+                )
+                for ds in cfgrib.open_datasets(
+                    str(grib), backend_kwargs={"indexpath": indexpath}
+                ):
+                    datasets.append(_normalize_grib(ds))
+            return xr.merge(datasets, combine_attrs="drop_conflicts")
+
+
+def _is_grib(fpath: str) -> bool:
+    fpath = Path(fpath)
+    if fpath.suffix == ".zip":
+        with zipfile.ZipFile(fpath, "r") as zip_files:
+            return any(n.endswith(GRIB_SUFFIXES) for n in zip_files.namelist())
+    if fpath.suffix in GRIB_SUFFIXES:
+        return True
+    with open(fpath, "rb") as f:
+        return f.read(4) == b"GRIB"
+
+
+def _extract_gribs(fpath: str, cache_dir: Path) -> list[Path]:
+    gribs = []
+    with zipfile.ZipFile(fpath, "r") as zip_files:
+        for info in zip_files.infolist():
+            if not info.filename.endswith(GRIB_SUFFIXES):
+                continue
+            name = Path(info.filename)
+            output = cache_dir / f"{name.stem}-{info.CRC:08x}{name.suffix}"
+            if output.exists() and output.stat().st_size == info.file_size:
+                os.utime(output)  # LRU: mtime is the last access
+            else:
+                tmp = output.with_suffix(".tmp")
+                with zip_files.open(info) as src, open(tmp, "wb") as dst:
+                    while chunk := src.read(2**24):
+                        dst.write(chunk)
+                os.replace(tmp, output)
+            gribs.append(output)
+    if not gribs:
+        raise ValueError(f"no GRIB data found in {fpath}")
+    return gribs
+
+
+def _evict_gribs(cache_dir: Path, max_size: int, keep: list[Path] = ()) -> None:
+    """Removes the least recently used extracted GRIBs, except `keep`"""
+    gribs = [f for f in cache_dir.iterdir() if f.suffix in GRIB_SUFFIXES]
+    stats = {f: f.stat() for f in gribs}
+    size = sum(stat.st_size for stat in stats.values())
+    for grib in sorted(gribs, key=lambda f: stats[f].st_mtime):
+        if size <= max_size:
+            break
+        if grib in keep:
+            continue
+        grib.unlink(missing_ok=True)
+        for index in cache_dir.glob(f"{grib.name}.*.idx"):
+            index.unlink(missing_ok=True)
+        size -= stats[grib].st_size
+
+
+def _normalize_grib(ds: "xr.Dataset") -> "xr.Dataset":
+    """
+    cfgrib indexes the data by forecast reference `time` and `step`, the
+    NetCDF downloads by `valid_time` (time + step). Accumulated variables
+    (e.g. `tp`) have both dimensions and are flattened into `valid_time`.
+    A request for a day D comes back as `time=[D-1, D]` x `step=[..24h]`,
+    the combinations outside D are NaN and dropped; duplicated valid times
+    keep the entry with the most data.
+    """
+    import numpy as np
+    import pandas as pd
+
+    ds = ds.drop_vars(
+        ["number", "surface", "heightAboveGround", "depthBelowLandLayer"],
+        errors="ignore",
+    )
+
+    if "step" in ds.dims:
+        # cfgrib squeezes length-1 dimensions, e.g. the single forecast
+        # `time` of a one day request without 00:00
+        for dim in ("time", "step"):
+            if dim not in ds.dims:
+                ds = ds.expand_dims(dim)
+            if dim not in ds.valid_time.dims:
+                ds = ds.assign_coords(valid_time=ds.valid_time.expand_dims(dim))
+        valid_time = ds.valid_time.transpose("time", "step").values.reshape(-1)
+        ds = ds.stack(_valid_time=("time", "step"))
+        ds = ds.drop_vars(["_valid_time", "time", "step", "valid_time"])
+        ds = ds.assign_coords(_valid_time=valid_time)
+        ds = ds.rename(_valid_time="valid_time")
+    else:
+        if "time" not in ds.dims:
+            ds = ds.expand_dims("time")
+        valid_time = ds.valid_time.values.reshape(-1)
+        ds = ds.drop_vars(["step", "valid_time"], errors="ignore")
+        ds = ds.assign_coords(time=valid_time).rename(time="valid_time")
+
+    ds = ds.transpose("valid_time", ...)
+
+    # non-NaN values per valid time, across every data variable
+    counts = np.zeros(ds.sizes["valid_time"], dtype="int64")
+    for var in ds.data_vars.values():
+        if "valid_time" in var.dims:
+            notnull = var.notnull().values.reshape(ds.sizes["valid_time"], -1)
+            counts += notnull.sum(axis=1)
+
+    entries = pd.DataFrame({"valid_time": ds.valid_time.values, "count": counts})
+    entries = entries[entries["valid_time"].notnull() & (entries["count"] > 0)]
+    entries = entries.sort_values(["valid_time", "count"], ascending=[True, False])
+    entries = entries[~entries["valid_time"].duplicated()]
+    return ds.isel(valid_time=entries.index.to_numpy())
@@ -1,11 +1,12 @@
-from typing import Optional, Dict, Literal
+from typing import TYPE_CHECKING, Any, Optional, Dict, Literal
 from datetime import datetime, timedelta
 from pathlib import Path
 
-import xarray as xr
-
 from satellite.models import ERA5LandRequest, DataSet
 
+if TYPE_CHECKING:
+    import xarray as xr
+
 
 def reanalysis_era5_land(
     output: str,
@@ -32,7 +33,8 @@ def reanalysis_era5_land(
     area: Optional[Dict[Literal["N", "S", "W", "E"], float]] = None,
     format: Literal["grib", "netcdf"] = "netcdf",
     download_format: Literal["zip", "unarchived"] = "zip",
-) -> xr.Dataset:
+    adms: Optional[list[Any]] = None,
+) -> "xr.Dataset":
     request = dict(
         product_type=product_type,
         variable=variable,
@@ -42,9 +44,10 @@ def reanalysis_era5_land(
         area=area,
         format=format,
         download_format=download_format,
+        adms=adms,
     )
     if output and Path(output).is_file():
-        return DataSet.from_netcdf(output)
-    return DataSet.from_netcdf(
+        return DataSet.open(output)
+    return DataSet.open(
         ERA5LandRequest(api_key=api_token, request=request).download(output)
     )
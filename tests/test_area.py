@@ -0,0 +1,68 @@
+import unittest
+
+import geopandas as gpd
+from pydantic import ValidationError
+from shapely.geometry import box
+
+from satellite.geo.models import ADMBase
+from satellite.models import Area, ERA5LandSpecs
+
+
+class _FakeADM(ADMBase):
+    __tablename__ = "fake"
+    __fields__ = ["code", "name"]
+
+    def __init__(self, *bounds):
+        self.code = "0000000"
+        self.name = "Fake"
+        self.bounds = bounds
+
+    def to_dataframe(self, tolerance=None) -> gpd.GeoDataFrame:
+        return gpd.GeoDataFrame(geometry=[box(*self.bounds)], crs="EPSG:4326")
+
+
+class TestArea(unittest.TestCase):
+    def test_from_adms_grid_aligned_bbox(self):
+        adms = [
+            _FakeADM(-43.79, -23.08, -43.1, -22.74),
+            _FakeADM(-44.0, -23.0, -43.5, -22.8),
+        ]
+
+        area = Area.from_adms(adms)
+
+        # pixels (0.1°) whose center is less than half a pixel from the bounds
+        self.assertEqual(area.bbox, [-22.7, -44.0, -23.1, -43.1])
+
+    def test_from_adms_excludes_touching_pixels(self):
+        # bounds on the pixel edges: -22.85 is the edge between -22.8 & -22.9
+        area = Area.from_adms([_FakeADM(-43.25, -22.95, -43.05, -22.85)])
+
+        self.assertEqual(area.bbox, [-22.9, -43.2, -22.9, -43.1])
+
+    def test_specs_area_from_adms(self):
+        adm = _FakeADM(-43.79, -23.08, -43.1, -22.74)
+        expected = Area.from_adms([adm]).bbox
+
+        self.assertEqual(ERA5LandSpecs(adms=[adm]).area, expected)
+        # `adms` takes precedence over `locale`
+        self.assertEqual(ERA5LandSpecs(adms=[adm], locale="BRA").area, expected)
+
+    def test_specs_rejects_invalid_adms(self):
+        with self.assertRaisesRegex(ValidationError, "non empty list"):
+            ERA5LandSpecs(adms=[])
+        with self.assertRaisesRegex(ValidationError, "is not an ADM"):
+            ERA5LandSpecs(adms=["3304557"])
+
+    def test_from_coords_reuses_existing_bbox(self):
+        a = Area.from_coords(north=1.0, west=2.0, south=0.0, east=3.0)
+        b = Area.from_coords(north=1.0, west=2.0, south=0.0, east=3.0)
+
+        self.assertEqual(a.locale, b.locale)
+        self.assertEqual(Area.from_coords(5.5, -74.0, -33.75, -32.25).locale, "BRA")
+
+    def test_custom_areas_registry_is_bounded(self):
+        for i in range(Area.MAX_CUSTOM_AREAS + 10):
+            area = Area.from_coords(north=10.0, west=float(i), south=0.0, east=179.0)
+
+        self.assertEqual(len(Area._custom_areas), Area.MAX_CUSTOM_AREAS)
+        self.assertEqual(area.bbox, [10.0, float(i), 0.0, 179.0])
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+from satellite import DataSet, ADM2
+from satellite.extensions.cache import ResultCache, dataset_hash
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.tmp.name, max_size=2**20)
+        self.adm = ADM2.get(code=3304557, adm0="BRA")
+        file = Path(__file__).parent / "data" / "BR_20230101.nc"
+        self.dataset = DataSet.from_netcdf(str(file))
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_dataset_hash_follows_content(self):
+        ds_hash = dataset_hash(self.dataset)
+        changed = self.dataset.copy(deep=True)
+        changed["t2m"][0, 0, 0] = changed["t2m"][0, 0, 0] + 1
+
+        self.assertEqual(ds_hash, dataset_hash(self.dataset.copy(deep=True)))
+        self.assertNotEqual(ds_hash, dataset_hash(changed))
+
+    def test_key_depends_on_adm_and_options(self):
+        key = self.cache.key("hash", self.adm, simplify=True)
+
+        self.assertEqual(key, self.cache.key("hash", self.adm, simplify=True))
+        self.assertNotEqual(key, self.cache.key("hash", self.adm, simplify=False))
+        self.assertNotEqual(key, self.cache.key("other", self.adm, simplify=True))
+
+    def test_put_get_and_eviction(self):
+        df = pd.DataFrame({"geocode": ["3304557"] * 1000, "temp_med": range(1000)})
+        self.assertIsNone(self.cache.get("missing"))
+
+        self.cache.put("a", df)
+        pd.testing.assert_frame_equal(self.cache.get("a"), df)
+
+        self.cache.max_size = self.cache.size
+        self.cache.put("b", df)
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertIsNotNone(self.cache.get("b"))
+
+    def test_put_only_rescans_when_full(self):
+        df = pd.DataFrame({"geocode": ["3304557"] * 10, "temp_med": range(10)})
+        with mock.patch("satellite.extensions.cache.os.scandir") as scandir:
+            for i in range(20):
+                self.cache.put(str(i), df)
+
+        scandir.assert_not_called()
+        self.assertEqual(self.cache.size, 20 * os.path.getsize(self.cache._fpath("0")))
+
+    def test_unreadable_or_evicted_entries_are_misses(self):
+        df = pd.DataFrame({"geocode": ["3304557"], "temp_med": [25.0]})
+        self.cache.put("a", df)
+        self.cache._fpath("a").write_bytes(b"truncated pickle")
+        self.cache.put("b", df)
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertFalse(self.cache._fpath("a").exists())
+        with mock.patch(
+            "satellite.extensions.cache.os.utime", side_effect=FileNotFoundError
+        ):
+            pd.testing.assert_frame_equal(self.cache.get("b"), df)
@@ -4,8 +4,14 @@ from pathlib import Path
 from pstats import Stats
 
 import loguru
+import numpy as np
 import xarray as xr
+import xagg as xa
+import geopandas as gpd
+from shapely.geometry import Polygon
 from satellite import DataSet, ADM2, ADM0
+from satellite.extensions.cope import _grid_tolerance
+from satellite.geo.constants import SIMPLIFY_FRACTION
 
 logger = loguru.logger
 
@@ -43,3 +49,49 @@ class TestWeatherCopebr(unittest.TestCase):
         self.assertTrue(type(dataset) == xr.core.dataset.Dataset)
         self.assertEqual(list(dataset.keys()), ["t2m", "tp", "d2m", "msl"])
         self.assertEqual(list(dataset.coords), ["longitude", "latitude", "time"])
+
+    def test_grid_tolerance_follows_dataset_resolution(self):
+        tolerance = _grid_tolerance(self.dataset)
+
+        self.assertAlmostEqual(tolerance, 0.25 * SIMPLIFY_FRACTION, places=6)
+        self.assertIsNone(
+            _grid_tolerance(self.dataset.isel(latitude=[0], longitude=[0]))
+        )
+
+    def test_simplified_geometry_overlap_weights(self):
+        lat = np.round(np.arange(-22, -24.01, -0.1), 4)
+        lon = np.round(np.arange(-44, -41.99, 0.1), 4)
+        ds = xr.Dataset(
+            {"t2m": (("latitude", "longitude"), np.ones((len(lat), len(lon))))},
+            coords={"latitude": lat, "longitude": lon},
+        )
+        # jagged border: 2000 vertices with up to 0.03° of noise
+        rng = np.random.default_rng(0)
+        angles = np.linspace(0, 2 * np.pi, 2000, endpoint=False)
+        radius = 0.6 * (1 - 0.05 * rng.random(2000))
+        full = Polygon(
+            zip(-43 + radius * np.cos(angles), -23 + radius * np.sin(angles))
+        )
+        tolerance = _grid_tolerance(ds)
+        simplified = full.simplify(tolerance, preserve_topology=True)
+
+        def weights(geometry) -> dict:
+            gdf = gpd.GeoDataFrame(
+                {"code": ["1"], "name": ["jagged"]}, geometry=[geometry], crs=4326
+            )
+            wm = xa.pixel_overlaps(ds, gdf, silent=True)
+            rel_area = np.ravel(wm.agg.rel_area[0])
+            return dict(zip(np.ravel(wm.agg.pix_idxs[0]), rel_area / rel_area.sum()))
+
+        full_w, simplified_w = weights(full), weights(simplified)
+        error = sum(
+            abs(full_w.get(pix, 0) - simplified_w.get(pix, 0))
+            for pix in set(full_w) | set(simplified_w)
+        )
+
+        self.assertLess(len(simplified.exterior.coords), len(full.exterior.coords))
+        # area moved by the simplification is bounded by t * L
+        self.assertLessEqual(
+            full.symmetric_difference(simplified).area, tolerance * full.length
+        )
+        self.assertLessEqual(error, 2 * tolerance * full.length / full.area)
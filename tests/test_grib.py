@@ -0,0 +1,248 @@
+import os
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from satellite.models import (
+    DataSet,
+    _normalize_grib,
+    _is_grib,
+    _extract_gribs,
+    _evict_gribs,
+)
+
+try:
+    import cfgrib  # noqa
+    import eccodes
+except (ImportError, RuntimeError):  # cfgrib or the ecCodes library missing
+    eccodes = None
+
+NC_FILE = Path(__file__).parent / "data" / "BR_20230101.nc"
+
+
+def _cfgrib_like(var: str, steps: list[int]) -> xr.Dataset:
+    """Dataset with cfgrib's layout: forecast `time`, `step` & `valid_time`"""
+    time = pd.date_range("2023-01-01", periods=2, freq="1D")
+    step = pd.to_timedelta(steps, unit="h")
+    lat, lon = [-22.8, -22.9], [-43.2, -43.1]
+    dims = ("time", "step", "latitude", "longitude")
+    data = np.arange(2 * len(steps) * 4, dtype="float32").reshape(2, len(steps), 2, 2)
+    ds = xr.Dataset(
+        {var: (dims, data)},
+        coords={
+            "time": time,
+            "step": step,
+            "latitude": lat,
+            "longitude": lon,
+            "number": 0,
+            "surface": 0.0,
+            "valid_time": (("time", "step"), time.values[:, None] + step.values),
+        },
+    )
+    if len(steps) == 1:
+        ds = ds.squeeze("step")
+    return ds
+
+
+def _era5_land_accum(day: str = "2023-01-02") -> xr.Dataset:
+    """
+    Sparse layout of an accumulated variable requested for `day` (3-hourly):
+    `time=[D-1, D]` x `step=[0h..24h]`, only the valid times within D hold
+    data. D+0h is a partially filled duplicate of D-1+24h
+    """
+    d = pd.Timestamp(day)
+    time = pd.DatetimeIndex([d - pd.Timedelta(days=1), d])
+    step = pd.to_timedelta(range(0, 25, 3), unit="h")
+    valid_time = time.values[:, None] + step.values
+    data = np.full((2, len(step), 2, 2), np.nan, dtype="float32")
+    for i, j in np.ndindex(2, len(step)):
+        vt = pd.Timestamp(valid_time[i, j])
+        if vt.normalize() == d and not (i == 1 and j == 0):
+            data[i, j] = vt.hour
+    data[1, 0, 0, 0] = -1  # D+0h: a single non-NaN pixel
+    return xr.Dataset(
+        {"tp": (("time", "step", "latitude", "longitude"), data)},
+        coords={
+            "time": time,
+            "step": step,
+            "latitude": [-22.8, -22.9],
+            "longitude": [-43.2, -43.1],
+            "valid_time": (("time", "step"), valid_time),
+        },
+    )
+
+
+def _write_grib(fpath: Path, messages: list[tuple[int, str, int, bool]]) -> None:
+    """
+    ERA5-Land like GRIB1 file on a 3x2 grid, `messages` are (paramId,
+    reference datetime, step hours, accumulated) and the values are the step
+    """
+    with open(fpath, "wb") as f:
+        for param, reference, step, accum in messages:
+            ref = pd.Timestamp(reference)
+            gid = eccodes.codes_grib_new_from_samples("regular_ll_sfc_grib1")
+            keys = {
+                "centre": "ecmf",
+                "paramId": param,
+                "dataDate": int(ref.strftime("%Y%m%d")),
+                "dataTime": ref.hour * 100,
+                "Ni": 2,
+                "Nj": 3,
+                "latitudeOfFirstGridPointInDegrees": -22.5,
+                "longitudeOfFirstGridPointInDegrees": -43.5,
+                "latitudeOfLastGridPointInDegrees": -23.0,
+                "longitudeOfLastGridPointInDegrees": -43.25,
+                "iDirectionIncrementInDegrees": 0.25,
+                "jDirectionIncrementInDegrees": 0.25,
+            }
+            if accum:
+                keys.update(stepType="accum", startStep=0, endStep=step)
+            else:
+                keys["step"] = step
+            for key, value in keys.items():
+                eccodes.codes_set(gid, key, value)
+            eccodes.codes_set_values(gid, np.full(6, float(step)))
+            eccodes.codes_write(gid, f)
+            eccodes.codes_release(gid)
+
+
+class TestGrib(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _zip(self, name: str, members: dict[str, bytes]) -> Path:
+        fpath = self.dir / name
+        with zipfile.ZipFile(fpath, "w") as zfile:
+            for member, data in members.items():
+                zfile.writestr(member, data)
+        return fpath
+
+    def test_normalize_sparse_accumulated_layout(self):
+        ds = _normalize_grib(_era5_land_accum("2023-01-02"))
+
+        expected = pd.date_range("2023-01-02", periods=8, freq="3h")
+        self.assertTrue(ds.get_index("valid_time").equals(expected))
+        self.assertFalse(ds.tp.isnull().any())
+        # the duplicated midnight keeps the fully filled D-1+24h entry
+        self.assertTrue((ds.tp.sel(valid_time="2023-01-02T00:00") == 0).all())
+
+    def test_normalize_squeezed_forecast_time(self):
+        # one day, 03h and 06h: a single forecast `time`, squeezed by cfgrib
+        ds = _era5_land_accum("2023-01-02").isel(time=1, step=[1, 2])
+        ds = _normalize_grib(ds)
+
+        expected = pd.to_datetime(["2023-01-02T03:00", "2023-01-02T06:00"])
+        self.assertTrue(ds.get_index("valid_time").equals(expected))
+        self.assertEqual(list(ds.tp.dims), ["valid_time", "latitude", "longitude"])
+
+    @unittest.skipIf(eccodes is None, "cfgrib and ecCodes are not installed")
+    def test_from_grib(self):
+        grib = self.dir / "era5_land.grib"
+        _write_grib(
+            grib,
+            [(167, f"2023-01-02T{h:02d}", 0, False) for h in (0, 6, 12, 18)]
+            + [(228, "2023-01-01", 24, True)]
+            + [(228, "2023-01-02", h, True) for h in (6, 12, 18)],
+        )
+        zipped = self.dir / "era5_land.zip"
+        with zipfile.ZipFile(zipped, "w") as zfile:
+            zfile.write(grib, arcname="data.grib")
+        cache = self.dir / "cache"
+
+        # the second zipped open reuses the extracted file and its index
+        for fpath in (grib, zipped, zipped):
+            ds = DataSet.from_grib(str(fpath), cache_dir=cache)
+
+            expected = pd.date_range("2023-01-02", periods=4, freq="6h")
+            self.assertTrue(ds.get_index("valid_time").equals(expected))
+            self.assertEqual(set(ds.data_vars), {"t2m", "tp"})
+            self.assertFalse(ds.tp.isnull().any())
+            # the midnight accumulation is the previous forecast's +24h step
+            self.assertEqual(float(ds.tp.sel(valid_time=expected[0]).max()), 24)
+            self.assertEqual(ds.longitude.values.tolist(), [-43.5, -43.25])
+
+        self.assertEqual(len(list(cache.glob("data-*.grib"))), 1)
+        self.assertTrue(any(cache.glob("data-*.grib.*.idx")))
+
+    @unittest.skipIf(eccodes is None, "cfgrib and ecCodes are not installed")
+    def test_from_grib_single_forecast_time(self):
+        grib = self.dir / "era5_land.grib"
+        _write_grib(grib, [(228, "2023-01-02", h, True) for h in (3, 6)])
+
+        ds = DataSet.from_grib(str(grib), cache_dir=self.dir / "cache")
+
+        expected = pd.to_datetime(["2023-01-02T03:00", "2023-01-02T06:00"])
+        self.assertTrue(ds.get_index("valid_time").equals(expected))
+        self.assertEqual(ds.tp.isel(latitude=0, longitude=0).values.tolist(), [3, 6])
+
+    def test_is_grib(self):
+        grib = self.dir / "data.grib"
+        grib.write_bytes(b"GRIB" + bytes(10))
+        no_suffix = self.dir / "download"
+        no_suffix.write_bytes(b"GRIB" + bytes(10))
+
+        self.assertTrue(_is_grib(grib))
+        self.assertTrue(_is_grib(no_suffix))
+        self.assertFalse(_is_grib(NC_FILE))
+        self.assertTrue(_is_grib(self._zip("g.zip", {"data.grib": b"GRIB"})))
+        self.assertFalse(_is_grib(self._zip("n.zip", {"data.nc": b"CDF"})))
+
+    def test_extract_gribs_skips_extracted_files(self):
+        content = b"GRIB" + bytes(100)
+        fpath = self._zip("g.zip", {"a.grib": content, "README.txt": b"-"})
+        cache = self.dir / "cache"
+        cache.mkdir()
+
+        (grib,) = _extract_gribs(fpath, cache)
+        self.assertEqual(grib.read_bytes(), content)
+
+        # same size, different content: a re-extraction would overwrite it
+        grib.write_bytes(b"X" * len(content))
+        self.assertEqual(_extract_gribs(fpath, cache), [grib])
+        self.assertEqual(grib.read_bytes(), b"X" * len(content))
+
+        with self.assertRaises(ValueError):
+            _extract_gribs(self._zip("n.zip", {"data.nc": b"CDF"}), cache)
+
+    def test_evict_gribs(self):
+        cache = self.dir / "cache"
+        cache.mkdir()
+        old, new = cache / "old.grib", cache / "new.grib"
+        for i, grib in enumerate([old, new]):
+            grib.write_bytes(bytes(100))
+            (cache / f"{grib.name}.abcd.1234.idx").write_bytes(b"idx")
+            os.utime(grib, (i, i))
+
+        _evict_gribs(cache, max_size=150, keep=[])
+
+        self.assertFalse(old.exists())
+        self.assertEqual(list(cache.glob("old.grib.*.idx")), [])
+        self.assertTrue(new.exists())
+
+        _evict_gribs(cache, max_size=0, keep=[new])
+        self.assertTrue(new.exists())
+
+    def test_normalize_accumulated_variable(self):
+        ds = _normalize_grib(_cfgrib_like("tp", [3, 6, 9]))
+
+        self.assertEqual(list(ds.tp.dims), ["valid_time", "latitude", "longitude"])
+        self.assertEqual(ds.sizes["valid_time"], 6)
+        self.assertEqual(str(ds.valid_time.values[0]), "2023-01-01T03:00:00.000000000")
+        self.assertTrue(ds.get_index("valid_time").is_monotonic_increasing)
+        self.assertNotIn("number", ds.coords)
+
+    def test_normalize_instant_variable(self):
+        ds = _normalize_grib(_cfgrib_like("t2m", [0]))
+
+        self.assertEqual(list(ds.t2m.dims), ["valid_time", "latitude", "longitude"])
+        self.assertEqual(ds.sizes["valid_time"], 2)
+        self.assertNotIn("step", ds.coords)
@@ -0,0 +1,56 @@
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+# Wall time budget (seconds) for `import satellite` in a fresh interpreter
+IMPORT_BUDGET = 1.0
+
+HEAVY_MODULES = ["geopandas", "xarray", "xagg", "pandas", "cdsapi", "pydantic"]
+
+
+def _run(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.strip()
+
+
+class TestImport(unittest.TestCase):
+    def test_import_doesnt_load_heavy_modules(self):
+        loaded = _run(
+            "import sys, satellite; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        self.assertEqual(loaded, "")
+
+    def test_adm_get_doesnt_load_geometry_modules(self):
+        loaded = _run(
+            "import sys; from satellite import ADM2; "
+            "ADM2.get(code=3304557, adm0='BRA'); "
+            "print(','.join(m for m in ['geopandas', 'xarray', 'xagg', 'cdsapi']"
+            " if m in sys.modules))"
+        )
+        self.assertEqual(loaded, "")
+
+    def test_import_time_budget(self):
+        elapsed = float(
+            _run(
+                "import time; t = time.perf_counter(); import satellite; "
+                "print(time.perf_counter() - t)"
+            )
+        )
+        self.assertLess(elapsed, IMPORT_BUDGET)
+
+    def test_cope_accessor_available_after_opening_dataset(self):
+        file = Path(__file__).parent / "data" / "BR_20230101.nc"
+        self.assertEqual(
+            _run(
+                "from satellite import DataSet; "
+                f"ds = DataSet.from_netcdf({str(file)!r}); "
+                "print(hasattr(ds, 'cope'))"
+            ),
+            "True",
+        )
@@ -0,0 +1,196 @@
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from satellite import jobs
+from satellite.jobs import Job, JobSpec, State
+
+
+class _StubJob(Job):
+    """Job with `_download` and `_aggregate` recording their calls"""
+
+    def __init__(self, spec, fail_downloads: bool = False):
+        super().__init__(spec)
+        self.fail_downloads = fail_downloads
+        self.downloaded, self.aggregated = [], []
+        self.aggregating = threading.Event()
+        self._lock = threading.Lock()
+
+    def _download(self, unit):
+        if self.fail_downloads:
+            raise ConnectionError("CDS unavailable")
+        if self.downloaded:
+            # the next downloads only finish once an aggregation has started
+            assert self.aggregating.wait(timeout=10), "no download overlap"
+        with self._lock:
+            self.downloaded.append(unit.id)
+        self.state.mark_done(unit.id)
+        return unit.date
+
+    def _aggregate(self, unit, ds, engine):
+        self.aggregating.set()
+        assert ds == unit.download.date
+        with self._lock:
+            self.aggregated.append(unit.id)
+        self.state.mark_done(unit.id)
+
+
+class _LateAggregationJob(_StubJob):
+    """Aggregations only finish once every download has completed"""
+
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.n_downloads = len(self.plan())
+        self.all_downloaded = threading.Event()
+
+    def _download(self, unit):
+        ds = super()._download(unit)
+        if len(self.downloaded) == self.n_downloads:
+            self.all_downloaded.set()
+        return ds
+
+    def _aggregate(self, unit, ds, engine):
+        self.aggregating.set()
+        assert self.all_downloaded.wait(timeout=10), "downloads blocked"
+        super()._aggregate(unit, ds, engine)
+
+
+class _CountingSemaphore(threading.BoundedSemaphore):
+    def __init__(self, value: int = 1):
+        super().__init__(value)
+        self.acquired = self.released = 0
+        self._count_lock = threading.Lock()
+
+    def acquire(self, *args, **kwargs):
+        with self._count_lock:
+            self.acquired += 1
+        return super().acquire(*args, **kwargs)
+
+    def release(self, n: int = 1):
+        with self._count_lock:
+            self.released += n
+        super().release(n)
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spec = JobSpec(
+            date="2023-01-01/2023-01-10",
+            adm_level="ADM2",
+            adms={"adm0": "BRA", "adm1": "33"},
+            locale="BRA",
+            db="sqlite://",
+            output_dir=self.tmp.name,
+            chunk_days=4,
+            adms_per_unit=50,
+            download_workers=1,
+            aggregate_workers=1,
+        )
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_plan_splits_dates_and_adms(self):
+        job = Job(self.spec)
+        plan = job.plan()
+
+        self.assertEqual(
+            [download.date for download, _ in plan],
+            ["2023-01-01/2023-01-04", "2023-01-05/2023-01-08", "2023-01-09/2023-01-10"],
+        )
+        n_adms = len(job.adms)
+        for _, aggregates in plan:
+            self.assertEqual(sum(len(u.adms) for u in aggregates), n_adms)
+            self.assertTrue(all(len(u.adms) <= 50 for u in aggregates))
+
+    def test_state_checkpoint_survives_restart(self):
+        unit_id = Job(self.spec).plan()[0][1][0].id
+        Job(self.spec).state.mark_done(unit_id)
+
+        state = State(Path(self.tmp.name) / ".satellite-state.json")
+        self.assertTrue(state.done(unit_id))
+        self.assertFalse(state.done("download:2023-01-05/2023-01-08"))
+
+    def test_invalid_date_range(self):
+        with self.assertRaises(ValueError):
+            JobSpec(date="2023-01-10/2023-01-01", db="sqlite://")
+
+    def _run(self, job: Job) -> int:
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(failed=job.run()))
+        thread.start()
+        thread.join(timeout=30)
+        self.assertFalse(thread.is_alive(), "job deadlocked")
+        return result["failed"]
+
+    def test_run_overlaps_stages_and_skips_completed_units(self):
+        job = _StubJob(self.spec)
+        n_units = sum(1 + len(aggs) for _, aggs in job.plan())
+
+        self.assertEqual(self._run(job), 0)
+        self.assertEqual(len(job.downloaded) + len(job.aggregated), n_units)
+
+        restarted = _StubJob(self.spec)
+        self.assertEqual(self._run(restarted), 0)
+        self.assertEqual(restarted.downloaded + restarted.aggregated, [])
+
+    def test_run_counts_failed_downloads_without_deadlock(self):
+        # more chunks than in-memory slots: leaked slots would block the run
+        spec = self.spec.model_copy(update={"chunk_days": 1})
+        job = _StubJob(spec, fail_downloads=True)
+        n_units = sum(1 + len(aggs) for _, aggs in job.plan())
+
+        self.assertEqual(self._run(job), n_units)
+        self.assertEqual(job.aggregated, [])
+
+    def test_run_releases_one_slot_per_download(self):
+        spec = self.spec.model_copy(update={"download_workers": 2})
+        job = _LateAggregationJob(spec)
+        semaphores = []
+
+        def semaphore(value):
+            semaphores.append(_CountingSemaphore(value))
+            return semaphores[-1]
+
+        with mock.patch.object(jobs.threading, "BoundedSemaphore", semaphore):
+            self.assertEqual(self._run(job), 0)
+
+        (in_memory,) = semaphores
+        self.assertEqual(in_memory.acquired, job.n_downloads)
+        self.assertEqual(in_memory.released, job.n_downloads)
+
+    def test_aggregate_is_idempotent_and_creates_table_once(self):
+        engine = create_engine(f"sqlite:///{self.tmp.name}/weather.sqlite")
+        job = Job(self.spec)
+
+        def to_dataframe(adm):
+            dates = pd.date_range("2023-01-01", "2023-01-04")
+            return pd.DataFrame({"date": dates, "geocode": adm.code, "temp_med": 25.0})
+
+        ds = SimpleNamespace(cope=SimpleNamespace(to_dataframe=to_dataframe))
+        units = job.plan()[0][1]
+
+        # concurrent first inserts in an empty database, then a re-run
+        threads = [
+            threading.Thread(target=job._aggregate, args=(unit, ds, engine))
+            for unit in units
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        job._aggregate(units[0], ds, engine)
+
+        engine.dispose()
+        with sqlite3.connect(f"{self.tmp.name}/weather.sqlite") as con:
+            rows = pd.read_sql("SELECT geocode, date FROM weather", con)
+        self.assertEqual(len(rows), 4 * len(job.adms))
+        self.assertFalse(rows.duplicated().any())
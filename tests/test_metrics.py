@@ -0,0 +1,72 @@
+import unittest
+from pathlib import Path
+
+from satellite import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        self.exporter = metrics.add_exporter(metrics.MemoryExporter())
+
+    def tearDown(self) -> None:
+        metrics.remove_exporter(self.exporter)
+
+    def test_disabled_hooks_are_noop(self):
+        metrics.remove_exporter(self.exporter)
+
+        self.assertFalse(metrics.enabled())
+        with metrics.span("stage") as span:
+            metrics.count("rows_written", 10)
+
+        self.assertIsNone(span)
+        self.assertEqual(self.exporter.spans, [])
+        self.assertEqual(self.exporter.counters, {})
+
+    def test_nested_spans_and_counters(self):
+        with metrics.span("outer", adm="1"):
+            with metrics.span("inner"):
+                metrics.count("rows_written", 10)
+                metrics.count("rows_written", 5)
+
+        inner, outer = self.exporter.spans
+        self.assertEqual(inner.parent, "outer")
+        self.assertIsNone(outer.parent)
+        self.assertEqual(outer.tags, {"adm": "1"})
+        self.assertGreaterEqual(outer.duration, inner.duration)
+        self.assertEqual(self.exporter.counters["rows_written"], 15)
+        self.assertEqual(self.exporter.summary()["stages"]["outer"]["calls"], 1)
+
+    def test_span_records_error(self):
+        with self.assertRaises(KeyError):
+            with metrics.span("stage"):
+                raise KeyError("adm")
+
+        self.assertEqual(self.exporter.spans[0].error, "KeyError")
+
+    def test_failing_exporter_doesnt_affect_stage(self):
+        class FailingExporter(metrics.Exporter):
+            def on_span(self, span):
+                raise RuntimeError("exporter down")
+
+            def on_count(self, name, value, tags):
+                raise RuntimeError("exporter down")
+
+        failing = metrics.add_exporter(FailingExporter())
+        try:
+            with metrics.span("ok"):
+                metrics.count("rows_written", 1)
+            with self.assertRaises(KeyError):
+                with metrics.span("stage"):
+                    raise KeyError("adm")
+        finally:
+            metrics.remove_exporter(failing)
+
+        self.assertEqual([s.name for s in self.exporter.spans], ["ok", "stage"])
+        self.assertEqual(self.exporter.counters["rows_written"], 1)
+
+    def test_dataset_open_span(self):
+        from satellite import DataSet
+
+        DataSet.from_netcdf(str(Path(__file__).parent / "data" / "BR_20230101.nc"))
+
+        self.assertEqual([s.name for s in self.exporter.spans], ["dataset.open"])